@@ -0,0 +1,520 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the hot paths in generate_langs.py, on synthetic input. Each
+is measured against the slower reference it replaced, or against not doing
+it at all where the question is whether it pays:
+
+    python3 scripts/bench_langs.py                  # everything
+    python3 scripts/bench_langs.py commit-graph     # just one
+"""
+import difflib
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import generate_langs as gl  # noqa: E402
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def report(label, old_s, new_s):
+    ratio = old_s / new_s if new_s else float("inf")
+    print(f"  {label:<34} {old_s * 1000:9.1f} ms -> {new_s * 1000:8.1f} ms"
+          f"  ({ratio:,.{0 if ratio >= 10 else 2}f}x)")
+
+# -------------------- diff --------------------
+
+def sequence_matcher_edits(old, new):
+    """What notebook_diff used to do."""
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+    added = deleted = 0
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag in ("replace", "delete"):
+            deleted += i2 - i1
+        if tag in ("replace", "insert"):
+            added += j2 - j1
+    return added, deleted
+
+
+def notebook_cells(rng, n_cells):
+    """Code lines shaped like a plotting notebook: lots of repeats."""
+    lines = []
+    for i in range(n_cells):
+        lines += [f"fig, ax = plt.subplots()  # {rng.randrange(50)}",
+                  f"ax.plot(df['c{rng.randrange(30)}'])", "plt.show()", "",
+                  "", f"x = {rng.randrange(1000)}"]
+    return lines
+
+
+def git_numstat(old, new):
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [os.path.join(tmp, "a"), os.path.join(tmp, "b")]
+        for path, lines in zip(paths, (old, new)):
+            with open(path, "w") as handle:
+                handle.write("".join(line + "\n" for line in lines))
+        out = subprocess.run(["git", "diff", "--no-index", "--numstat",
+                              "--diff-algorithm=minimal"] + paths,
+                             capture_output=True, text=True).stdout
+    if not out:
+        return 0, 0
+    added, deleted = out.split("\t")[:2]
+    return int(added), int(deleted)
+
+
+def bench_diff():
+    print("diff: notebook line counts, SequenceMatcher vs line_edits")
+    rng = random.Random(7)
+    base = notebook_cells(rng, 700)
+    moved = base[len(base) // 2:] + base[:len(base) // 2]
+    cases = {
+        "one line changed (4.2k lines)":
+            (base, base[:2000] + ["x = -1"] + base[2001:]),
+        "halves swapped (4.2k lines)": (base, moved),
+        "rewritten (4.2k lines)": (base, notebook_cells(rng, 700)),
+        "blank lines shuffled (3k lines)":
+            (["", "plt.show()"] * 1500,
+             rng.sample(["", "plt.show()"] * 1500, 3000)),
+    }
+    for label, (old, new) in cases.items():
+        expected, old_s = timed(sequence_matcher_edits, old, new)
+        got, new_s = timed(gl.line_edits, old, new)
+        report(label, old_s, new_s)
+        # SequenceMatcher isn't minimal, so it can only ever count more.
+        assert sum(got) <= sum(expected), (label, got, expected)
+
+    mismatches = 0
+    for _ in range(200):
+        old = [rng.choice("abcdef ") for _ in range(rng.randrange(60))]
+        new = [rng.choice("abcdefg") for _ in range(rng.randrange(60))]
+        if gl.line_edits(old, new) != git_numstat(old, new):
+            mismatches += 1
+    print(f"  agrees with git diff --numstat on {200 - mismatches}/200 "
+          f"random texts")
+    assert not mismatches
+
+
+# -------------------- commit-graph --------------------
+
+def synthetic_repo(path, n_commits, rng, mine_every=3):
+    """Bare repo with n_commits, every mine_every-th of them mine, each
+    touching a few of a few hundred files — built with fast-import so it
+    takes seconds, streamed so building it doesn't inflate this process."""
+    subprocess.run(["git", "init", "--quiet", "--bare", path], check=True)
+    proc = subprocess.Popen(["git", "fast-import", "--quiet"], cwd=path,
+                            stdin=subprocess.PIPE)
+    for i in range(n_commits):
+        who = ("me <me@example.com>" if i % mine_every == 0
+               else "them <them@example.com>")
+        chunk = [f"commit refs/heads/main\n"
+                 f"committer {who} {1_600_000_000 + i * 60} +0000\n"
+                 f"data 8\ncommit {i % 10}\n"]
+        for _ in range(rng.randint(1, 4)):
+            body = f"{i} {rng.random()}\n" * rng.randint(1, 30)
+            chunk.append(f"M 644 inline src/d{rng.randrange(20)}/"
+                         f"f{rng.randrange(300)}.py\n"
+                         f"data {len(body)}\n{body}\n")
+        proc.stdin.write("".join(chunk).encode())
+    proc.stdin.close()
+    if proc.wait():
+        raise RuntimeError("git fast-import failed")
+    subprocess.run(["git", "symbolic-ref", "HEAD", "refs/heads/main"],
+                   cwd=path, check=True)
+
+
+def history_pass(path):
+    """What measure_repo runs against a repo: the name pass, the walk, and
+    the ancestry check the incremental path makes."""
+    identities = {"me@example.com"}
+    list(gl.walk_names(path, identities))
+    list(gl.walk_history(path, identities))
+    first = gl.run_git(["rev-list", "--max-parents=0", "HEAD"], cwd=path)
+    gl.is_ancestor(path, first.strip())
+
+
+def best_of(runs, fn, *args):
+    return min(timed(fn, *args)[1] for _ in range(runs))
+
+
+def bench_commit_graph():
+    print("commit-graph: cost of writing it vs what one history pass saves")
+    rng = random.Random(3)
+    variants = {"graph": ["--reachable"],
+                "graph + bloom": ["--reachable", "--changed-paths"]}
+    for n_commits, mine_every in ((250, 3), (500, 3), (1000, 3), (2000, 3),
+                                  (8000, 3), (8000, 50), (30000, 50),
+                                  (30000, 500)):
+        print(f"  {n_commits} commits, 1 in {mine_every} mine:")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "repo.git")
+            synthetic_repo(path, n_commits, rng, mine_every)
+            plain_s = best_of(5, history_pass, path)
+            print(f"    {'no graph':<14} {'':>20} pass {plain_s * 1000:7.1f} ms")
+            for label, args in variants.items():
+                _, write_s = timed(gl.run_git, ["commit-graph", "write"] + args,
+                                   path)
+                graph_s = best_of(5, history_pass, path)
+                saved = plain_s - graph_s
+                even = (f"{write_s / saved:5.1f} runs" if saved > 0
+                        else "never")
+                print(f"    {label:<14} write {write_s * 1000:7.1f} ms, "
+                      f"pass {graph_s * 1000:7.1f} ms, break-even {even}")
+
+
+# -------------------- backends --------------------
+
+def git(cwd, *args, **env):
+    subprocess.run(["git"] + list(args), cwd=cwd, check=True,
+                   capture_output=True,
+                   env=dict(os.environ, GIT_AUTHOR_DATE="1600000000 +0000",
+                            GIT_COMMITTER_DATE="1600000000 +0000", **env))
+
+
+def edge_case_repo(path):
+    """Small repo with every shape of change the backends must agree on:
+    root commit, renames with and without edits, renames out of and into
+    an excluded directory, a binary, a non-ASCII path, a symlink, a mode
+    change, a deletion, a merge, a mailmapped author and regex characters
+    in an email, all in the same second."""
+    work = path + ".work"
+    git(None, "init", "--quiet", "-b", "main", work)
+
+    def commit(email, message, **files):
+        for name, body in files.items():
+            name = name.replace("__", "/").replace("_DOT_", ".")
+            full = os.path.join(work, name)
+            if body is None:
+                git(work, "rm", "--quiet", name)
+                continue
+            os.makedirs(os.path.dirname(full), exist_ok=True)
+            with open(full, "wb") as handle:
+                handle.write(body)
+        git(work, "add", "--all")
+        git(work, "commit", "--quiet", "--allow-empty", "-m", message,
+            GIT_AUTHOR_NAME="Me", GIT_AUTHOR_EMAIL=email,
+            GIT_COMMITTER_NAME="Me", GIT_COMMITTER_EMAIL=email)
+
+    lines = b"".join(b"line %d\n" % i for i in range(40))
+    commit("me@example.com", "root", src__a_DOT_py=lines,
+           node_modules__x__y_DOT_js=b"x\n", data_DOT_JSON=b"{}\n")
+    commit("me+work@example.com", "regex chars", src__b_DOT_c=b"int x;\n")
+    commit("me@example.com", "rename with edit",
+           src__a_DOT_py=None, lib__a_DOT_py=lines.replace(b"line 3", b"x"))
+    commit("me@example.com", "binary", img_DOT_png=b"\x89PNG\0\0" * 50)
+    commit("them@example.com", "not mine", src__b_DOT_c=b"int y;\n")
+    commit("old@example.com", "mailmapped to me", Übung_DOT_py=b"print(1)\n")
+    with open(os.path.join(work, ".mailmap"), "w") as handle:
+        handle.write("Me <me@example.com> <old@example.com>\n")
+    os.symlink("lib/a.py", os.path.join(work, "link"))
+    commit("me@example.com", "mailmap and symlink")
+    os.chmod(os.path.join(work, "src", "b.c"), 0o755)
+    commit("me@example.com", "mode", node_modules__x__y_DOT_js=b"y\n",
+           data_DOT_JSON=b"[]\n", img_DOT_png=None)
+    git(work, "checkout", "--quiet", "-b", "side", "HEAD~2")
+    commit("me@example.com", "on a branch", side_DOT_rs=b"fn main() {}\n")
+    git(work, "checkout", "--quiet", "main")
+    git(work, "merge", "--quiet", "--no-edit", "side",
+        GIT_AUTHOR_NAME="Me", GIT_AUTHOR_EMAIL="me@example.com",
+        GIT_COMMITTER_NAME="Me", GIT_COMMITTER_EMAIL="me@example.com")
+    commit("me@example.com", "after merge", lib__a_DOT_py=lines)
+    vendored = b"".join(b"var v%d = %d;\n" % (i, i) for i in range(40))
+    commit("me@example.com", "vendor", node_modules__x__v_DOT_js=vendored)
+    commit("me@example.com", "move out of node_modules",
+           node_modules__x__v_DOT_js=None, src__v_DOT_js=vendored + b"1;\n")
+    commit("me@example.com", "move back in", src__v_DOT_js=None,
+           node_modules__x__v_DOT_js=vendored)
+    git(None, "clone", "--quiet", "--bare", work, path)
+
+
+def backend_records(backend, path):
+    identities = {"me@example.com", "me+work@example.com"}
+    excludes = (gl.generated_pathspecs(("dir", ["node_modules"]))
+                + [gl.extension_pathspec(".json")])
+    with gl.HISTORY_BACKENDS[backend](path) as history:
+        head = history.head()
+        root = gl.run_git(["rev-list", "--max-parents=0", "HEAD"],
+                          cwd=path).split()[0]
+        since = gl.run_git(["rev-parse", "HEAD~3"], cwd=path).strip()
+        changes = list(history.changes(identities))
+        names = list(history.names(identities))
+        rewalk = gl.crossing_renames(names, excludes)
+        return {
+            "head": head,
+            "ancestors": [history.is_ancestor(oid)
+                          for oid in (root, since, "0" * 40)],
+            "names": names,
+            "rewalk": len(rewalk),
+            "changes": changes,
+            "excluded": list(history.changes(identities, None, excludes,
+                                             rewalk)),
+            "since": list(history.changes(identities, since)),
+            "blobs": [history.read(oid) for *_, old, new in changes
+                      for oid in (old, new) if oid],
+        }
+
+
+def bench_backends():
+    print("backends: git CLI vs pygit2 on the same repos")
+    try:
+        import pygit2  # noqa: F401
+    except ImportError:
+        print("  pygit2 not installed; skipped")
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "edges.git")
+        edge_case_repo(path)
+        expected = backend_records("git", path)
+        got = backend_records("pygit2", path)
+        for key in expected:
+            assert got[key] == expected[key], (key, got[key], expected[key])
+        print(f"  identical records on the edge-case repo "
+              f"({len(expected['changes'])} changes)")
+        # Small repos are mostly process start-up for the git CLI...
+        small = {backend: timed(lambda: [backend_records(backend, path)
+                                         for _ in range(20)])[1]
+                 for backend in ("git", "pygit2")}
+        report("edge-case repo, 20 passes", small["git"], small["pygit2"])
+
+        # ...but libgit2 compares every entry of a changed directory, which
+        # git skips through far faster: wide trees turn the result around.
+        path = os.path.join(tmp, "big.git")
+        synthetic_repo(path, 5000, random.Random(5))
+        timings = {}
+        for backend in ("git", "pygit2"):
+            with gl.HISTORY_BACKENDS[backend](path) as history:
+                timings[backend] = timed(
+                    lambda: list(history.changes({"me@example.com"})))
+        assert timings["git"][0] == timings["pygit2"][0]
+        report("walk 5000 commits, 300-file dirs", timings["git"][1],
+               timings["pygit2"][1])
+
+
+# -------------------- rss --------------------
+
+class ChangeTable:
+    """Columnar store for change records — interned path/sha/oid ids in
+    array('I') columns, binary as a bitmask. Only here as the reference
+    for what buffering a history compactly would cost; the script itself
+    never buffers one."""
+
+    def __init__(self):
+        self.strings, self.names = {}, []
+        self.columns = [array("I") for _ in range(7)]
+        self.binary = bytearray()
+
+    def intern(self, text):
+        if text not in self.strings:
+            self.strings[text] = len(self.names)
+            self.names.append(text)
+        return self.strings[text]
+
+    def append(self, row):
+        sha, path, old_path, added, deleted, binary, old_oid, new_oid = row
+        count = len(self.columns[0])
+        if count % 8 == 0:
+            self.binary.append(0)
+        self.binary[-1] |= binary << (count % 8)
+        for column, value in zip(self.columns, (
+                self.intern(sha), self.intern(path), self.intern(old_path),
+                added, deleted, self.intern(old_oid or ""),
+                self.intern(new_oid or ""))):
+            column.append(value)
+
+    def __iter__(self):
+        names = self.names
+        for i, (sha, path, old, added, deleted, old_oid, new_oid) in \
+                enumerate(zip(*self.columns)):
+            yield (names[sha], names[path], names[old], added, deleted,
+                   bool(self.binary[i // 8] >> (i % 8) & 1),
+                   names[old_oid] or None, names[new_oid] or None)
+
+
+def rss_child(mode, path):
+    """Peak RSS of one way of getting through a history, in its own
+    process so ru_maxrss means something."""
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    identities = {"me@example.com"}
+    if mode == "list of tuples":
+        held = list(gl.walk_history(path, identities))
+    elif mode == "columnar table":
+        held = ChangeTable()
+        for row in gl.walk_history(path, identities):
+            held.append(row)
+    else:
+        repo = {"nameWithOwner": "me/big",
+                "languages": {"edges": [{"size": 1,
+                                         "node": {"name": "Python"}}]}}
+        held = gl.measure_repo(repo, path, identities, None, "")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    del held
+    print((peak - before) // 1024)
+
+
+def bench_rss():
+    print("rss: memory above import for a 40,000-commit, ~100k-change history")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "big.git")
+        synthetic_repo(path, 40_000, random.Random(9), mine_every=1)
+        for mode in ("list of tuples", "columnar table", "streamed (measure_repo)"):
+            out = subprocess.run(
+                [sys.executable, "-c",
+                 "import sys; sys.argv = ['']; import bench_langs; "
+                 f"bench_langs.rss_child({mode!r}, {path!r})"],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                env=dict(os.environ, LANGSTATS_CACHE=""),
+                capture_output=True, text=True, check=True).stdout.split()
+            print(f"  {mode:<24} {int(out[0]):>5} MB")
+
+
+# -------------------- suffix --------------------
+
+def split_join_candidates(path):
+    """What candidates_for used to do: probe every dotted suffix, in the
+    plain dicts the maps used to be."""
+    filenames = gl.FILENAME_TO_LANGS.materialized()
+    exts = gl.EXT_TO_LANGS.materialized()
+    base = os.path.basename(path)
+    if base in filenames:
+        return base, filenames[base]
+    parts = base.lower().split(".")
+    for i in range(1, len(parts)):
+        suffix = "." + ".".join(parts[i:])
+        if suffix in exts:
+            return suffix, exts[suffix]
+    return None, []
+
+
+def path_corpus(rng, count):
+    """Paths shaped like a web/data-science monorepo: mostly one extension,
+    some hashed bundles and .d.ts files, dotfiles, known filenames, odd
+    case and the occasional non-ASCII name."""
+    dirs = ["src", "lib", "app", "components", "node_modules", "test", "dist"]
+    exts = [".py", ".js", ".ts", ".d.ts", ".tsx", ".c", ".h", ".json", ".md",
+            ".min.js", ".ipynb", ".rs", ".go", ".yml", ".lock", ".png",
+            ".txt", ".PY", ".Rmd", ""]
+    names = ["Makefile", "Dockerfile", ".gitignore", "README", "LICENSE",
+             ".bashrc", "Übung.ipynb", "CMakeLists.txt"]
+    paths = []
+    for _ in range(count):
+        folder = "/".join(rng.choice(dirs) for _ in range(rng.randint(0, 4)))
+        roll = rng.random()
+        if roll < 0.1:
+            name = f"main.{rng.getrandbits(32):08x}.chunk.js"
+        elif roll < 0.15:
+            name = "foo.test.module.d.ts"
+        elif roll < 0.2:
+            name = rng.choice(names)
+        else:
+            name = f"file{rng.randrange(1000)}{rng.choice(exts)}"
+        paths.append(f"{folder}/{name}" if folder else name)
+    return paths
+
+
+def bench_suffix():
+    print("suffix: candidates_for, split/join probing vs reversed trie")
+    corpus = path_corpus(random.Random(1), 200_000)
+    dotted = ["a.b.c.d.e.f.g.h.i.j.k.l.m.n.o.p.q.r.s.t.u.v.w.x.y.z.js"] * 20_000
+    gl.suffix_trie()                    # built once per run, not per call
+    for label, paths in (("200k realistic paths", corpus),
+                         ("20k names with 26 dots", dotted)):
+        report(label,
+               best_of(5, lambda: [split_join_candidates(p) for p in paths]),
+               best_of(5, lambda: [gl.candidates_for(p) for p in paths]))
+        assert ([gl.candidates_for(p) for p in paths]
+                == [split_join_candidates(p) for p in paths])
+    every = [f"dir/name{ext}{tail}" for ext in gl.EXT_TO_LANGS
+             for tail in ("", ".orig")]
+    every += [path.upper() for path in every]
+    assert ([gl.candidates_for(p) for p in every]
+            == [split_join_candidates(p) for p in every])
+    print(f"  identical on all {len(every):,} registered-extension probes")
+
+
+def bench_generated():
+    print("generated: is_generated, one regex at a time vs one matcher")
+    old = lambda path: any(rx.search(path) for rx in gl.GENERATED_RE)
+    corpus = path_corpus(random.Random(1), 200_000)
+    vendored = [f"web/node_modules/pkg{i % 300}/lib/file{i}.js"
+                for i in range(200_000)]
+    for label, paths in (("200k realistic paths", corpus),
+                         ("200k under node_modules", vendored)):
+        # a fresh matcher each run, so the per-directory cache starts cold
+        report(label,
+               best_of(5, lambda: [old(p) for p in paths]),
+               best_of(5, lambda: list(map(gl.GeneratedMatcher(
+                   gl.GENERATED_PATH_PATTERNS), paths))))
+        assert [old(p) for p in paths] == list(map(gl.is_generated, paths))
+    print("  identical verdicts")
+
+
+def header_blobs(path, count, rng):
+    """Repo of `count` .h files, 4-60 KB each, C or Objective-C; returns
+    their blob oids."""
+    os.makedirs(path)
+    git(path, "init", "-q")
+    for i in range(count):
+        first = ("#import <Foundation/Foundation.h>\n@interface T : NSObject"
+                 if i % 3 == 0 else "#include <stdio.h>\nint f(void);")
+        body = "".join(f"int v{j} = {rng.randrange(1 << 30)};\n"
+                       for j in range(rng.randrange(200, 3000)))
+        with open(os.path.join(path, f"h{i}.h"), "w") as handle:
+            handle.write(first + "\n" + body)
+    git(path, "add", "-A")
+    git(path, "commit", "-qm", "headers", GIT_AUTHOR_NAME="me",
+        GIT_AUTHOR_EMAIL="me@x.io", GIT_COMMITTER_NAME="me",
+        GIT_COMMITTER_EMAIL="me@x.io")
+    listing = subprocess.run(["git", "ls-tree", "HEAD"], cwd=path,
+                             capture_output=True, text=True, check=True)
+    return [line.split()[2] for line in listing.stdout.splitlines()]
+
+
+def bench_sniff():
+    print("sniff: ambiguous blobs, whole and one at a time vs batched heads")
+    with tempfile.TemporaryDirectory() as tmp:
+        oids = header_blobs(os.path.join(tmp, "mix"), 2000, random.Random(1))
+        git(os.path.join(tmp, "mix"), "gc", "-q")       # packed, like a mirror
+
+        def one_by_one():
+            with gl.BlobReader(os.path.join(tmp, "mix")) as reader:
+                return {oid: reader.read(oid) for oid in oids}
+
+        def batched():
+            with gl.BlobReader(os.path.join(tmp, "mix")) as reader:
+                return reader.read_many(oids, gl.CONTENT_SNIFF_BYTES)
+
+        report(f"{len(oids):,} headers, 4-60 KB",
+               best_of(3, one_by_one), best_of(3, batched))
+        whole, heads = one_by_one(), batched()
+        assert all(heads[oid] == whole[oid][:gl.CONTENT_SNIFF_BYTES]
+                   for oid in oids)
+        resolver = gl.LanguageResolver({"C", "Objective-C"})
+        resolver.resolve("h.h")
+        with gl.GitHistory(os.path.join(tmp, "mix")) as history:
+            resolver.settle(history, [(".h", oid) for oid in oids])
+        verdicts = [resolver.verdict(".h", oid) for oid in oids]
+        print(f"  settled: {verdicts.count('Objective-C')} Objective-C, "
+              f"{verdicts.count('C')} C")
+
+
+BENCHES = {"diff": bench_diff, "commit-graph": bench_commit_graph,
+           "backends": bench_backends, "rss": bench_rss,
+           "suffix": bench_suffix, "generated": bench_generated,
+           "sniff": bench_sniff}
+
+
+def main():
+    for name in sys.argv[1:] or list(BENCHES):
+        BENCHES[name]()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for GitHub's GraphQL endpoint, so discovery can be run and
+timed without a token or network:
+
+    python3 scripts/graphql_standin.py --synthetic 2000 --latency 150 &
+    GITHUB_GRAPHQL_URL=http://127.0.0.1:8787/graphql GITHUB_TOKEN=x \\
+        GH_USERNAME=octo python3 scripts/generate_langs.py
+
+Either replays exchanges captured with `generate_langs.py --record FILE`
+(--replay FILE), or makes up an account with N repos (--synthetic N) and
+answers the queries generate_langs sends. Latency, failed pages, pages
+too big to serve and the primary rate limit can all be simulated. It only
+speaks GraphQL: clones still go to github.com, so for a full offline run
+pair it with mirrors already in LANGSTATS_CACHE.
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LANGUAGES = ["Python", "C", "C++", "JavaScript", "TypeScript", "Go", "Rust",
+             "Shell", "Makefile", "HTML", "CSS", "Jupyter Notebook", "Java"]
+
+
+def request_key(query, variables):
+    return json.dumps([query, variables], sort_keys=True)
+
+
+class Replay:
+    """Recorded exchanges, served back in the order they were recorded.
+    A query asked more often than it was recorded gets its last answer."""
+
+    def __init__(self, path):
+        self.exchanges = {}
+        with open(path, encoding="utf-8") as handle:
+            for line in handle:
+                if line.strip():
+                    entry = json.loads(line)
+                    key = request_key(entry["query"], entry["variables"])
+                    self.exchanges.setdefault(key, []).append(entry)
+
+    def answer(self, query, variables):
+        queue = self.exchanges.get(request_key(query, variables))
+        if not queue:
+            return 404, {}, {"message": "not in the recording"}
+        entry = queue.pop(0) if len(queue) > 1 else queue[0]
+        return entry["status"], entry.get("headers", {}), entry["body"]
+
+
+class Account:
+    """A made-up user with `repos` owned repos and `contributed` others'."""
+
+    def __init__(self, login, repos, contributed, forks, seed):
+        rng = random.Random(seed)
+        now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        self.login = login
+        self.repos = {}
+        for i in range(repos + contributed):
+            owner = login if i < repos else f"org{i % 7}"
+            name = f"{owner}/repo{i}"
+            pushed = now - timedelta(minutes=rng.randrange(3 * 365 * 24 * 60))
+            langs = rng.sample(LANGUAGES, rng.randint(1, 5))
+            mine = rng.choice([0, 0, 1, 3, 12, 80]) if i >= repos else \
+                rng.choice([1, 4, 20, 150])
+            self.repos[name] = {
+                "owned": i < repos,
+                "list": {
+                    "nameWithOwner": name,
+                    "isPrivate": rng.random() < 0.3,
+                    "isFork": i < repos and rng.random() < forks,
+                    "isEmpty": rng.random() < 0.02,
+                    "diskUsage": rng.randrange(20, 200_000),
+                    "pushedAt": pushed.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                },
+                "detail": {
+                    "languages": {"edges": [
+                        {"size": rng.randrange(100, 2_000_000),
+                         "node": {"name": lang}} for lang in langs]},
+                    "defaultBranchRef": {"name": "main", "target": {
+                        "oid": f"{rng.getrandbits(160):040x}",
+                        "history": {"totalCount": mine, "nodes": [
+                            {"author": {"email": f"{login}@users.example",
+                                        "name": login}}][:mine]},
+                        "allCommits": {"totalCount":
+                                       mine + rng.randrange(0, 5000)}}},
+                },
+            }
+
+    def answer(self, query, variables):
+        if "repository(owner:" in query:
+            data = {}
+            for key, owner in variables.items():
+                if re.fullmatch(r"o\d+", key):
+                    repo = self.repos.get(f"{owner}/{variables['n' + key[1:]]}")
+                    data["r" + key[1:]] = repo and repo["detail"]
+            return data
+        if "after" not in variables:
+            return {"user": {"id": "U_standin", "login": self.login,
+                             "name": self.login.title()}}
+        owned = "repositoriesContributedTo" not in query
+        nodes = sorted((repo["list"] for repo in self.repos.values()
+                        if repo["owned"] == owned),
+                       key=lambda node: node["pushedAt"], reverse=True)
+        start = int(variables.get("after") or 0)
+        end = min(len(nodes), start + variables["size"])
+        field = "repositories" if owned else "repositoriesContributedTo"
+        return {"user": {field: {
+            "pageInfo": {"hasNextPage": end < len(nodes),
+                         "endCursor": str(end)},
+            "nodes": nodes[start:end]}}}
+
+
+class RateLimit:
+    """GitHub's primary limit: `limit` points per `window` seconds, one
+    point a request."""
+
+    def __init__(self, limit, window):
+        self.limit, self.window = limit, window
+        self.lock = threading.Lock()
+        self.remaining, self.reset = limit, time.time() + window
+
+    def spend(self):
+        with self.lock:
+            if time.time() >= self.reset:
+                self.remaining, self.reset = self.limit, time.time() + self.window
+            allowed = self.remaining > 0
+            if allowed:
+                self.remaining -= 1
+            headers = {"X-RateLimit-Limit": str(self.limit),
+                       "X-RateLimit-Remaining": str(self.remaining),
+                       "X-RateLimit-Reset": str(int(self.reset))}
+            fields = {"cost": 1, "remaining": self.remaining,
+                      "resetAt": datetime.fromtimestamp(
+                          self.reset, timezone.utc).strftime(
+                              "%Y-%m-%dT%H:%M:%SZ")}
+        return allowed, headers, fields
+
+
+def make_handler(args, source, limit):
+    rng = random.Random(args.seed)
+    rng_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *params):
+            if args.verbose:
+                super().log_message(fmt, *params)
+
+        def send(self, status, headers, body):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(
+                int(self.headers.get("Content-Length", 0))))
+            query, variables = request["query"], request.get("variables") or {}
+            time.sleep(args.latency / 1000)
+            if isinstance(source, Replay):
+                self.send(*source.answer(query, variables))
+                return
+
+            allowed, headers, fields = limit.spend()
+            if not allowed:
+                self.send(403, headers, {"message": "API rate limit exceeded"})
+                return
+            with rng_lock:
+                failed = rng.random() < args.fail_rate
+            if failed or variables.get("size", 0) > args.max_page:
+                self.send(502, headers, {"message": "Server Error"})
+                return
+            data = source.answer(query, variables)
+            if "rateLimit" in query:
+                data["rateLimit"] = fields
+            self.send(200, headers, {"data": data})
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--replay", metavar="FILE",
+                      help="serve exchanges recorded with --record")
+    mode.add_argument("--synthetic", metavar="N", type=int,
+                      help="make up an account owning N repos")
+    parser.add_argument("--contributed", type=int, default=0,
+                        help="other people's repos the account committed to")
+    parser.add_argument("--forks", type=float, default=0.3,
+                        help="share of owned repos that are forks")
+    parser.add_argument("--login", default="octo")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency", type=float, default=0,
+                        help="milliseconds added to every response")
+    parser.add_argument("--fail-rate", type=float, default=0,
+                        help="share of requests answered 502")
+    parser.add_argument("--max-page", type=int, default=100,
+                        help="pages bigger than this 502, like a timeout")
+    parser.add_argument("--rate-limit", type=int, default=5000,
+                        help="requests allowed per window")
+    parser.add_argument("--rate-window", type=float, default=3600,
+                        help="seconds until the rate limit resets")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    if args.replay:
+        source = Replay(args.replay)
+    else:
+        source = Account(args.login, args.synthetic, args.contributed,
+                         args.forks, args.seed)
+    limit = RateLimit(args.rate_limit, args.rate_window)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port),
+                                 make_handler(args, source, limit))
+    print(f"GITHUB_GRAPHQL_URL=http://127.0.0.1:{server.server_port}/graphql",
+          file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()